@@ -450,7 +450,7 @@ def main():
             times = np.delete(times, 0)
 
         snodes, p0 = TL.get_occupancies()
-        assert np.isclose(sum(p0), 1)
+        assert np.isclose(p0.sum(), 1)
         if args.plot_minh:
             assert args.plot_minh > TL.minh, "Plot-minh must be greater than minh."
             # Provide coarse network to get even more coarse network
@@ -493,10 +493,10 @@ def main():
                         for n in plot_cgm[node]:
                             ci = snodes.index(n)
                             occu += pt[ci]/len(mapping[n])
-                    ni = TL.nodes[node]['identity']
+                    ni = TL.nodes[node].identity
                     if occu < 0.001 and ni not in all_courses:
                         continue
-                    ne = TL.nodes[node]['energy']/100
+                    ne = TL.nodes[node].energy/100
                     all_courses[ni] = [(tt, occu)]
                     fdata = f"{ni} {tt:03.4f} {occu:03.4f} {node[:tlen]} {ne:6.2f}\n"
                     write_output(fdata, stdout = (args.stdout == 'drf'), fh = dfh)
@@ -507,8 +507,8 @@ def main():
 
         # NOTE: just for debugging, check if p8 is calculated correctly.
         #tlp8 = TL.get_equilibrium_occupancies(snodes)
-        #Z = sum(math.e**(-TL.nodes[n]['energy']/100/_RT) for n in snodes)
-        #myp8 = np.array([math.e**(-TL.nodes[n]['energy']/100/_RT)/Z for n in snodes])
+        #Z = sum(math.exp(-TL.nodes[n].energy/100/TL.RT) for n in snodes)
+        #myp8 = np.array([math.exp(-TL.nodes[n].energy/100/TL.RT)/Z for n in snodes])
         #assert np.allclose(tlp8, myp8)
 
         # ~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -518,13 +518,13 @@ def main():
         # Print the current state *after* the simulation.
         if args.stdout == 'log' or lfh:
             for e, node in enumerate(snodes):
-                ni = TL.nodes[node]['identity']
-                ne = TL.nodes[node]['energy']/100
+                ni = TL.nodes[node].identity
+                ne = TL.nodes[node].energy/100
                 po = p0[e]
                 no = p8[e]
                 if args.plot_minh:
-                    lmins = [TL.nodes[n]['identity'] for n in sorted(mapping[node], 
-                                                                     key = lambda x: TL.nodes[x]['identity'])]
+                    lmins = [TL.nodes[n].identity for n in sorted(mapping[node], 
+                                                                  key = lambda x: TL.nodes[x].identity)]
                     if lmins:
                         ni +=  f" -> {', '.join(lmins)}"
                 ax = ' ' if np.isclose(po, no, atol=1e-4) else '+' if no > po else '-'
@@ -573,11 +573,11 @@ def main():
         lnodes, pX = TL.get_occupancies()
         if args.plot_minh:
             for e, node in enumerate([s for s in snodes if s in plot_cgm]):
-                ne = TL.nodes[node]['energy']/100
+                ne = TL.nodes[node].energy/100
                 no = p8[e] + sum(p8[snodes.index(n)]/len(mapping[n]) for n in plot_cgm[node])
                 eo = pe[e] + sum(pe[snodes.index(n)]/len(mapping[n]) for n in plot_cgm[node])
-                ni = TL.nodes[node]['identity']
-                nids = [TL.nodes[n]['identity'] for n in sorted(plot_cgm[node], key = lambda x: TL.nodes[x]['identity'])]
+                ni = TL.nodes[node].identity
+                nids = [TL.nodes[n].identity for n in sorted(plot_cgm[node], key = lambda x: TL.nodes[x].identity)]
                 if nids:
                     ni +=  f" + {' + '.join(nids)}"
                 ax = ' ' if np.isclose(no, eo, atol=1e-4) else '+' if eo > no else '-'
@@ -585,10 +585,10 @@ def main():
             write_output(fdata, stdout = (args.stdout == 'log'), fh = lfh)
         else:
             for e, node in enumerate(snodes):
-                ne = TL.nodes[node]['energy']/100
+                ne = TL.nodes[node].energy/100
                 no = p8[e]
                 eo = pe[e]
-                ni = TL.nodes[node]['identity']
+                ni = TL.nodes[node].identity
                 ax = ' ' if np.isclose(no, eo, atol=1e-4) else '+' if eo > no else '-'
                 fdata += f"{tlen:4d} {e+1:4d} {node[:tlen]} {ne:6.2f} {no:6.4f} {ax}[t8: {eo:6.4f}] ID = {ni}\n"
             write_output(fdata, stdout=(args.stdout == 'log'), fh = lfh)
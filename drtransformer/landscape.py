@@ -10,6 +10,7 @@ drlog = logging.getLogger(__name__)
 import math
 import numpy as np
 from datetime import datetime
+from types import MappingProxyType
 
 import RNA
 
@@ -17,7 +18,146 @@ from .rnafolding import (get_guide_graph,
                          neighborhood_flooding,
                          find_fraying_neighbors,
                          top_down_coarse_graining)
-from .linalg import mx_simulate, get_p8_detbal
+from .linalg import mx_simulate, mx_simulate_two_state, get_p8_detbal
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# Node storage                                                                 #
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# Scalar node attributes: attribute name -> array name
+_ARRAY_ATTRS = {'energy': '_energy',
+                'occupancy': '_occ',
+                'active': '_active',
+                'pruned': '_pruned'}
+
+# Variable-size (or non-numeric) node attributes.
+_LIST_ATTRS = {'structure': '_structure',
+               'identity': '_identity',
+               'lminreps': '_lminreps',
+               'hiddennodes': '_hiddennodes',
+               'occtransfer': '_occtransfer'}
+
+_NODE_ATTRS = frozenset(_ARRAY_ATTRS) | frozenset(_LIST_ATTRS)
+
+# Row-indexed arrays of node and edge data (see TrafoLandscape.__init__).
+_NODE_ARRAYS = ('_energy', '_occ', '_active', '_pruned', '_hidden')
+_EDGE_ARRAYS = ('_edge_src', '_edge_dst')
+
+# Node selections: name -> mask given (active, hidden) arrays.
+_SELECTIONS = {'local_mins': lambda act, hid: ~hid,
+               'active_local_mins': lambda act, hid: act & ~hid,
+               'hidden_nodes': lambda act, hid: hid,
+               'active_nodes': lambda act, hid: act,
+               'inactive_nodes': lambda act, hid: ~act}
+
+class _Node:
+    """ Handle to the attributes of a single node.
+
+    The data lives in the struct-of-arrays storage of TrafoLandscape, this
+    object only stores the row of the node. There is one handle per node,
+    TrafoLandscape updates its row when other nodes are deleted (handles of
+    deleted nodes become unusable). Attributes can be accessed as node.energy or, for code that works with node data
+    dictionaries, as node['energy'].
+    """
+    __slots__ = ('_tl', '_idx')
+
+    @property
+    def structure(self):
+        return self._tl._structure[self._idx]
+
+    @structure.setter
+    def structure(self, value):
+        self._tl._structure[self._idx] = value
+
+    @property
+    def identity(self):
+        return self._tl._identity[self._idx]
+
+    @identity.setter
+    def identity(self, value):
+        self._tl._identity[self._idx] = value
+
+    @property
+    def energy(self):
+        return self._tl._energy.item(self._idx)
+
+    @energy.setter
+    def energy(self, value):
+        self._tl._energy[self._idx] = value
+
+    @property
+    def occupancy(self):
+        return self._tl._occ.item(self._idx)
+
+    @occupancy.setter
+    def occupancy(self, value):
+        self._tl._occ[self._idx] = value
+
+    @property
+    def active(self):
+        return self._tl._active.item(self._idx)
+
+    @active.setter
+    def active(self, value):
+        self._tl._active[self._idx] = value
+        self._tl._selections.clear()
+
+    @property
+    def pruned(self):
+        return self._tl._pruned.item(self._idx)
+
+    @pruned.setter
+    def pruned(self, value):
+        self._tl._pruned[self._idx] = value
+
+    @property
+    def lminreps(self):
+        return self._tl._lminreps[self._idx]
+
+    @lminreps.setter
+    def lminreps(self, value):
+        self._tl._set_lminreps(self._idx, value)
+
+    @property
+    def hiddennodes(self):
+        return self._tl._hiddennodes[self._idx]
+
+    @hiddennodes.setter
+    def hiddennodes(self, value):
+        self._tl._hiddennodes[self._idx] = value
+
+    @property
+    def occtransfer(self):
+        return self._tl._occtransfer[self._idx]
+
+    @occtransfer.setter
+    def occtransfer(self, value):
+        self._tl._occtransfer[self._idx] = value
+
+    def __init__(self, tl, idx):
+        self._tl = tl
+        self._idx = idx
+
+    def __getitem__(self, attr):
+        if attr not in _NODE_ATTRS:
+            raise KeyError(attr)
+        return getattr(self, attr)
+
+    def __setitem__(self, attr, value):
+        if attr not in _NODE_ATTRS:
+            raise KeyError(attr)
+        setattr(self, attr, value)
+
+    def get(self, attr, default = None):
+        return getattr(self, attr) if attr in self else default
+
+    def keys(self):
+        return list(_ARRAY_ATTRS) + list(_LIST_ATTRS)
+
+    def __contains__(self, attr):
+        return attr in _NODE_ATTRS
+
+    def __repr__(self):
+        return repr({a: self[a] for a in self.keys()})
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 # Transformer Landscape Object                                                 #
@@ -28,12 +168,21 @@ class TrafoLandscape:
     The backbone of any ribolands landscape object, inspired by networkx
     interface, although networkx dependency has been removed.
 
-    Suggested attributes for nodes: structure, identity, energy, occupancy, active
+    Node attributes: structure, identity, energy, occupancy, active, pruned,
+    lminreps, hiddennodes, occtransfer. The scalar attributes are stored as
+    parallel numpy arrays (one row per node, in order of insertion), the
+    others as parallel lists. TL.nodes[key] provides access to a single
+    node, e.g. TL.nodes[key].energy or TL.nodes[key]['energy'].
+
+    Lminreps are stored as frozensets (or None) because they determine the
+    mask of hidden nodes: assign a new set to change them, in-place changes
+    raise an AttributeError.
+
     Suggested attributes for edges: weight
     """
     def __init__(self, sequence, vrna_md, prefix = ''):
         self.sequence = sequence
-        self.md = vrna_md
+        self.md = vrna_md # sets self.RT
         self.fc = RNA.fold_compound(sequence, vrna_md)
         _ = self.fc.mfe() # fill matrices
 
@@ -41,9 +190,29 @@ class TrafoLandscape:
         self.nodeID = 0       # for autogenerated node IDs
 
         # Private instance variables:
-        self._nodes = dict()
+        self._key_to_idx = dict() # node key -> row in node arrays
+        self._keys = []
+        self._structure = []
+        self._identity = []
+        self._lminreps = []
+        self._hiddennodes = []
+        self._occtransfer = []
+        self._energy = np.empty(64, dtype = np.int32)
+        self._occ = np.empty(64, dtype = np.float64)
+        self._active = np.empty(64, dtype = np.bool_)
+        self._pruned = np.empty(64, dtype = np.int32)
+        self._hidden = np.empty(64, dtype = np.bool_) # lminreps is not empty
+        self._handles = dict()    # node key -> _Node, in order of self._keys
+        self._nodes = MappingProxyType(self._handles)
+        self._selections = dict() # cache: selection name -> (rows, keys)
         self._edges = dict()
+        self._edges_out = dict() # n1 -> {n2, ...} for (n1, n2) in self._edges
+        self._edges_in = dict()  # n2 -> {n1, ...} for (n1, n2) in self._edges
+        self._edge_keys = []     # (n1, n2) in order of insertion into self._edges
+        self._edge_src = np.empty(64, dtype = np.intp) # node row of n1
+        self._edge_dst = np.empty(64, dtype = np.intp) # node row of n2
         self._cg_edges = dict()
+        self._cg_out = dict()    # n1 -> [n2, ...] for (n1, n2) in self._cg_edges
 
         # Default parameters:
         self.k0 = 2e5 # set directly
@@ -53,12 +222,27 @@ class TrafoLandscape:
         self.transcript_length = 0 # set directly, updated automatically
 
     @property
-    def RT(self):
+    def md(self):
+        """ ViennaRNA model details, setting them binds RT to md.temperature.
+
+        NOTE: RT is not updated when md.temperature is changed afterwards,
+        assign the model details again (TL.md = TL.md) to refresh it.
+        """
+        return self._md
+
+    @md.setter
+    def md(self, vrna_md):
+        self._md = vrna_md
         RT = 0.61632077549999997
-        if self.md.temperature != 37.0:
-            kelvin = 273.15 + self.md.temperature
+        if vrna_md.temperature != 37.0:
+            kelvin = 273.15 + vrna_md.temperature
             RT = (RT / 310.15) * kelvin
-        return RT
+        self._RT = RT
+
+    @property
+    def RT(self):
+        """ Returns RT in kcal/mol for the temperature of self.md. """
+        return self._RT
 
     @property
     def transcript(self):
@@ -76,8 +260,12 @@ class TrafoLandscape:
     def cg_edges(self):
         return self._cg_edges
 
+    @property
+    def _nnodes(self):
+        return len(self._keys)
+
     def has_node(self, n):
-        return n in self._nodes
+        return n in self._key_to_idx
 
     def has_edge(self, s1, s2):
         return (s1, s2) in self._edges
@@ -99,42 +287,187 @@ class TrafoLandscape:
 
         - Active (bool) is to filter a subset of interesting nodes.
         - Lminreps (set) is to return a set of nodes that are the local minimum
-            reperesentatives of this node.
+            reperesentatives of this node (stored as frozenset).
         - Hiddennodes (set) is to return a set of nodes that are associated with
             this local minimum.
         After coarse graining, a node should have either lminreps or
         hiddennodes set, but not both. 
         """
-        assert key not in self._nodes
+        assert key not in self._key_to_idx
         if energy is not None:
             assert isinstance(energy, int), "Energy must be specified as integer."
         elif structure is not None:
             energy = int(round(self.fc.eval_structure(structure)*100))
+        else:
+            raise ValueError("Node requires either structure or energy.")
         if identity is None:
             identity = f'{self.prefix}{self.nodeID}'
             self.nodeID += 1
         assert isinstance(identity, str)
-        self._nodes[key] = {'structure': structure,
-                            'occupancy': occupancy,
-                            'identity': identity,
-                            'energy': energy,
-                            'active': active,
-                            'pruned': pruned,
-                            'lminreps': lminreps,
-                            'hiddennodes': hiddennodes,
-                            'occtransfer': occtransfer}
+        i = self._nnodes
+        if i == len(self._energy):
+            self._grow(_NODE_ARRAYS)
+        self._key_to_idx[key] = i
+        self._handles[key] = _Node(self, i)
+        self._keys.append(key)
+        self._structure.append(structure)
+        self._identity.append(identity)
+        self._lminreps.append(None if lminreps is None else frozenset(lminreps))
+        self._hiddennodes.append(hiddennodes)
+        self._occtransfer.append(occtransfer)
+        self._energy[i] = energy
+        self._occ[i] = occupancy
+        self._active[i] = active
+        self._pruned[i] = pruned
+        self._hidden[i] = bool(lminreps)
+        self._selections.clear()
+        return
+
+    def _add_structures(self, structures):
+        """ Add new (active) nodes, using the structure as key.
+
+        Free energies are evaluated in one pass over all structures before
+        the nodes are added, in the given order.
+        """
+        eval_structure = self.fc.eval_structure
+        energies = [int(round(eval_structure(ss)*100)) for ss in structures]
+        for ss, en in zip(structures, energies):
+            self.addnode(ss, structure = ss, energy = en)
+        return
+
+    def _set_lminreps(self, i, lminreps):
+        """ Set lminreps of node row i and keep the hidden-node mask in sync. """
+        lminreps = None if lminreps is None else frozenset(lminreps)
+        self._lminreps[i] = lminreps
+        self._hidden[i] = bool(lminreps)
+        self._selections.clear()
         return
 
+    def _grow(self, names):
+        """ Double the capacity of the given node or edge arrays. """
+        for name in names:
+            arr = getattr(self, name)
+            new = np.empty(2 * len(arr), dtype = arr.dtype)
+            new[:len(arr)] = arr
+            setattr(self, name, new)
+
+    def _delete_nodes(self, nodes):
+        """ Remove nodes and their edges, preserving the order of the remaining rows. 
+
+        Edges are found through the adjacency sets, so the cost is linear in
+        the degree of the deleted nodes rather than in the number of edges.
+        """
+        for node in nodes:
+            for y in self._edges_out.pop(node, ()):
+                del self._edges[(node, y)]
+                self._edges_in[y].discard(node)
+            for x in self._edges_in.pop(node, ()):
+                del self._edges[(x, node)]
+                self._edges_out[x].discard(node)
+
+        k2i = self._key_to_idx
+        dropped = np.zeros(self._nnodes, dtype = np.bool_)
+        dropped[[k2i[n] for n in nodes]] = True
+        keep = np.flatnonzero(~dropped)
+        for name in _NODE_ARRAYS:
+            arr = getattr(self, name)
+            arr[:len(keep)] = arr[keep]
+        for name in ('_keys',) + tuple(_LIST_ATTRS.values()):
+            lst = getattr(self, name)
+            setattr(self, name, [lst[i] for i in keep])
+        self._key_to_idx = {k: i for i, k in enumerate(self._keys)}
+        handles = self._handles
+        for node in nodes:
+            handles.pop(node)._idx = None
+        for k, i in self._key_to_idx.items():
+            handles[k]._idx = i
+
+        # Drop the edge rows of deleted nodes, renumber the remaining ones.
+        nE = len(self._edge_keys)
+        src, dst = self._edge_src[:nE], self._edge_dst[:nE]
+        ekeep = np.flatnonzero(~(dropped[src] | dropped[dst]))
+        newrow = np.cumsum(~dropped) - 1
+        self._edge_src[:len(ekeep)] = newrow[src[ekeep]]
+        self._edge_dst[:len(ekeep)] = newrow[dst[ekeep]]
+        self._edge_keys = [self._edge_keys[e] for e in ekeep]
+        self._selections.clear()
+        return
+
+    def _select(self, mask):
+        """ Return the node keys where mask is True (in order of insertion). """
+        keys = self._keys
+        return [keys[i] for i in np.flatnonzero(mask)]
+
+    def _selection(self, name):
+        """ Return rows and keys of a node selection (see _SELECTIONS).
+
+        Results are cached until the active or hidden state of a node
+        changes, or nodes are added or deleted.
+        """
+        if name not in self._selections:
+            N = self._nnodes
+            rows = np.flatnonzero(_SELECTIONS[name](self._active[:N], self._hidden[:N]))
+            keys = self._keys
+            self._selections[name] = (rows, [keys[i] for i in rows])
+        return self._selections[name]
+
+    def _energy_data(self, mask):
+        """ Return {key: {'energy': energy}} for nodes where mask is True. """
+        keys = self._keys
+        return {keys[i]: {'energy': int(e)} for i, e in 
+                zip(np.flatnonzero(mask), self._energy[:self._nnodes][mask])}
+
+    def _active_edge_data(self, saddle = False):
+        """ Return {(n1, n2): data} for all edges between active nodes.
+
+        Args:
+            saddle (bool, optional): Only return edges with known saddle
+                energy. Defaults to False.
+        """
+        nE = len(self._edge_keys)
+        active = self._active
+        mask = active[self._edge_src[:nE]] & active[self._edge_dst[:nE]]
+        ekeys, edges = self._edge_keys, self._edges
+        edata = {ekeys[e]: edges[ekeys[e]] for e in np.flatnonzero(mask)}
+        if saddle:
+            edata = {k: v for k, v in edata.items() if v['saddle_energy'] is not None}
+        return edata
+
+    def _sorted_rows(self, arr, rows, rev = False):
+        """ Return the array of rows, stable-sorted by the values in arr. """
+        vals = arr[rows] if not rev else -arr[rows].astype(np.float64)
+        return rows[np.argsort(vals, kind = 'stable')]
+
     def addedge(self, n1, n2, weight = None, **kwargs):
-        assert n1 in self._nodes
-        assert n2 in self._nodes
-        if (n1, n2) not in self._edges:
-            self._edges[(n1, n2)] = {'weight': weight}
-        self._edges[(n1, n2)].update(kwargs)
+        """ Add an edge or update its attributes (except weight). """
+        edge = self._edges.get((n1, n2))
+        if edge is not None:
+            # Common case: the edge is known with the same attributes.
+            if not kwargs.items() <= edge.items():
+                edge.update(kwargs)
+            return
+        assert n1 in self._key_to_idx
+        assert n2 in self._key_to_idx
+        self._edges[(n1, n2)] = {'weight': weight, **kwargs}
+        self._edges_out.setdefault(n1, set()).add(n2)
+        self._edges_in.setdefault(n2, set()).add(n1)
+        e = len(self._edge_keys)
+        if e == len(self._edge_src):
+            self._grow(_EDGE_ARRAYS)
+        self._edge_keys.append((n1, n2))
+        self._edge_src[e] = self._key_to_idx[n1]
+        self._edge_dst[e] = self._key_to_idx[n2]
         return
 
     def sorted_nodes(self, attribute = 'energy', rev = False, nodes = None):
         """ Provide active nodes or new nodes, etc. if needed. """
+        if attribute in _ARRAY_ATTRS:
+            arr = getattr(self, _ARRAY_ATTRS[attribute])
+            if nodes is None:
+                rows = np.arange(self._nnodes)
+            else:
+                rows = np.fromiter((self._key_to_idx[n] for n in nodes), dtype = np.intp)
+            return [self._keys[i] for i in self._sorted_rows(arr, rows, rev)]
         if nodes is None:
             nodes = self.nodes
         return sorted(nodes, key = lambda x: self.nodes[x][attribute], reverse = rev)
@@ -153,23 +486,23 @@ class TrafoLandscape:
 
     @property
     def local_mins(self):
-        return (n for n in self.nodes if not self.nodes[n]['lminreps'])
+        return iter(self._selection('local_mins')[1])
 
     @property
     def active_local_mins(self):
-        return (n for n in self.nodes if self.nodes[n]['active'] and not self.nodes[n]['lminreps'])
+        return iter(self._selection('active_local_mins')[1])
 
     @property
     def hidden_nodes(self):
-        return (n for n in self.nodes if self.nodes[n]['lminreps'])
+        return iter(self._selection('hidden_nodes')[1])
 
     @property
     def active_nodes(self):
-        return (n for n in self.nodes if self.nodes[n]['active'] is True)
+        return iter(self._selection('active_nodes')[1])
 
     @property
     def inactive_nodes(self):
-        return (n for n in self.nodes if self.nodes[n]['active'] is False)
+        return iter(self._selection('inactive_nodes')[1])
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.sequence}, {len(self.nodes)=}, {len(self.edges)=})"
@@ -194,13 +527,14 @@ class TrafoLandscape:
         if self.transcript_length > len(fseq):
             self.transcript_length = len(fseq)
         seq = self.transcript
+        tlen = len(seq)
         fc = self.fc
         mfree = self.mfree
         minh = self.minh
 
         # Calculate MFE of current transcript.
-        mfess, _ = fc.backtrack(len(seq))
-        future = '.' * (len(fseq) - len(seq))
+        mfess, _ = fc.backtrack(tlen)
+        future = '.' * (len(fseq) - tlen)
         mfess = mfess + future
 
         i_time = datetime.now()
@@ -214,56 +548,57 @@ class TrafoLandscape:
         else: 
             md = self.md
             fpwm = self.fpwm
-            parents = [x[0:len(seq)] for x in self.active_local_mins]
+            # Keys are structures padded with unpaired future nucleotides,
+            # truncation to the current transcript is therefore unique.
+            tsl = slice(0, tlen)
+            parents = [x[tsl] for x in self.active_local_mins]
             fraying_nodes = find_fraying_neighbors(seq, md, parents, mfree = mfree)
 
             # 1) Add all new structures to the set of nodes.
-            nn, on = set(), set()
+            nn, on, pending = set(), set(), []
             if mfess not in self.nodes:
-                self.addnode(mfess, structure = mfess)
+                pending.append(mfess)
                 nn.add(mfess)
-                assert self.nodes[mfess]['active']
-            elif not self.nodes[mfess]['active']:
+            elif not self.nodes[mfess].active:
                 on.add(mfess)
-                self.nodes[mfess]['active'] = True
+                self.nodes[mfess].active = True
 
             for fns in fraying_nodes.values():
                 for fn in fns:
                     fn += future
+                    if fn in nn:
+                        continue
                     if fn not in self.nodes:
-                        self.addnode(fn, structure = fn)
+                        pending.append(fn)
                         nn.add(fn)
-                        assert self.nodes[fn]['active']
-                    elif not self.nodes[fn]['active']:
+                    elif not self.nodes[fn].active:
                         on.add(fn)
-                        self.nodes[fn]['active'] = True
+                        self.nodes[fn].active = True
+            self._add_structures(pending)
 
             f_time = datetime.now()
 
-            ndata = {n[0:len(seq)]: d for n, d in self.nodes.items() if d['active']} 
-            gnodes, gedges = get_guide_graph(seq, md, ndata.keys())
+            gnodes, gedges = get_guide_graph(seq, md, [n[tsl] for n in self.active_nodes])
             assert all(ss != '' for (ss, en) in gnodes)
 
+            pending = []
             for (ss, en) in gnodes:
-                if ss + future not in self.nodes:
-                    self.addnode(ss + future, structure = ss+future)
-                    nn.add(ss + future)
-                elif not self.nodes[ss + future]['active']:
-                    on.add(ss + future)
-                    self.nodes[ss + future]['active'] = True
-            ndata = {n: d for n, d in self.nodes.items() if d['active']} 
-
-            lgedges = set()
-            for (x, y) in gedges:
-                lgedges.add((x+future, y+future))
-            gedges = lgedges
+                gn = ss + future
+                if gn not in self.nodes:
+                    pending.append(gn)
+                    nn.add(gn)
+                elif not self.nodes[gn].active:
+                    on.add(gn)
+                    self.nodes[gn].active = True
+            self._add_structures(pending)
+            ndata = self._energy_data(self._active[:self._nnodes])
+
+            gedges = {(x + future, y + future) for (x, y) in gedges}
 
             g_time = datetime.now()
 
             # 2) Include edge-data from previous network if nodes are active.
-            edata = {k: v for k, v in self.edges.items() if (self.nodes[k[0]]['active'] and 
-                                                             self.nodes[k[1]]['active']) and 
-                                                             v['saddle_energy'] is not None}
+            edata = self._active_edge_data(saddle = True)
 
             ndata, edata = neighborhood_flooding((fseq, md, fpwm), ndata, gedges, tedges = edata, minh = minh)
 
@@ -272,10 +607,10 @@ class TrafoLandscape:
                 if node not in self.nodes:
                     self.addnode(node, structure = node, energy = ndata[node]['energy'])
                     nn.add(node)
-                elif not self.nodes[node]['active']:
+                elif not self.nodes[node].active:
                     on.add(node)
-                    self.nodes[node]['active'] = True
-                assert self.nodes[node]['energy'] == ndata[node]['energy']
+                    self.nodes[node].active = True
+                assert self.nodes[node].energy == ndata[node]['energy']
 
             # 4) Update to new edges.
             for (x, y) in edata:
@@ -287,7 +622,7 @@ class TrafoLandscape:
             guidetime = (g_time - f_time).total_seconds()
             floodtime = (l_time - g_time).total_seconds()
             tottime = (l_time - i_time).total_seconds()
-            drlog.debug(f'{len(seq)=}, {tottime=}, {frayytime=}, {guidetime=}, {floodtime=}.')
+            drlog.debug(f'len(seq)={tlen}, {tottime=}, {frayytime=}, {guidetime=}, {floodtime=}.')
             pr = (tottime, frayytime, guidetime, floodtime) if performance_report else None
         return nn, on, pr
 
@@ -300,77 +635,111 @@ class TrafoLandscape:
         them.  
         """
         minh = self.minh
-
-        ndata = dict()
-        for n in self.nodes: 
-            self.nodes[n]['lminreps'] = set()
-            self.nodes[n]['hiddennodes'] = set()
-            # Because this node remained inactive during graph expansion, we
-            # can now safely transfer its occupancy.
-            if not self.nodes[n]['active'] and self.nodes[n]['occupancy'] != 0:
-                for tn in self.nodes[n]['occtransfer']:
-                    assert self.nodes[tn]['active']
-                    self.nodes[tn]['occupancy'] += self.nodes[n]['occupancy']/len(self.nodes[n]['occtransfer'])
-                self.nodes[n]['occupancy'] = 0
-        ndata = {n: d for n, d in self.nodes.items() if d['active']} # only active.
-        edata = {k: v for k, v in self.edges.items() if self.nodes[k[0]]['active'] and self.nodes[k[1]]['active']}
+        N = self._nnodes
+        k2i = self._key_to_idx
+        active, occ = self._active, self._occ
+
+        self._lminreps = [frozenset()] * N
+        self._hiddennodes = [set() for _ in range(N)]
+        self._hidden[:N] = False
+        self._selections.clear()
+        lminreps = self._lminreps
+        # Because these nodes remained inactive during graph expansion, we
+        # can now safely transfer their occupancy. Targets are active, so
+        # there are no chains of transfers and one scatter-add suffices.
+        src = np.flatnonzero(~active[:N] & (occ[:N] != 0))
+        if len(src):
+            otrans = [self._occtransfer[i] for i in src]
+            counts = np.fromiter(map(len, otrans), dtype = np.intp, count = len(src))
+            dst = np.fromiter((k2i[tn] for ot in otrans for tn in ot), 
+                              dtype = np.intp, count = counts.sum())
+            assert np.all(active[dst])
+            shares = np.repeat(occ[src] / counts, counts)
+            occ[src] = 0
+            np.add.at(occ, dst, shares)
+        ndata = self._energy_data(active[:N]) # only active.
+        edata = self._active_edge_data()
         cg_ndata, cg_edata, cg_mapping = top_down_coarse_graining(ndata, edata, minh)
         assert all((n in ndata) for n in cg_ndata)
 
         # Translate coarse grain results to TL.
-        self._cg_edges = dict()
+        ne = len(cg_edata)
+        ses = np.fromiter((d['saddle_energy'] for d in cg_edata.values()), 
+                          dtype = np.float64, count = ne)
+        exs = np.fromiter((cg_ndata[x]['energy'] for (x, y) in cg_edata), 
+                          dtype = np.float64, count = ne)
+        bars = (ses - exs) / 100
+        weights = self.k0 * np.exp(-bars / self.RT)
+        self._cg_edges = {k: {'saddle_energy': d['saddle_energy'], 'weight': w} 
+                          for (k, d), w in zip(cg_edata.items(), weights.tolist())}
+        self._cg_out = dict()
         for (x, y) in cg_edata:
-            se = cg_edata[(x, y)]['saddle_energy']
-            ex = cg_ndata[x]['energy']
-            bar = (se-ex) / 100
-            self._cg_edges[(x, y)] = {'saddle_energy': se,
-                                      'weight': self.k0 * math.e**(-bar/self.RT)}
+            self._cg_out.setdefault(x, []).append(y)
 
+        reps = dict()
         for lmin, hidden in cg_mapping.items():
-            assert self.nodes[lmin]['active']
+            assert active[k2i[lmin]]
             for hn in hidden:
-                assert self.nodes[hn]['active']
-                self.nodes[hn]['lminreps'].add(lmin)
-            self.nodes[lmin]['hiddennodes'] = hidden
+                j = k2i[hn]
+                assert active[j]
+                reps.setdefault(j, set()).add(lmin)
+            self._hiddennodes[k2i[lmin]] = hidden
+        for j, lreps in reps.items():
+            lminreps[j] = frozenset(lreps)
+        self._hidden[list(reps)] = True
 
         # Move occupancy to lmins.
-        for hn in self.hidden_nodes:
-            if not self.nodes[n]['active']:
-                assert self.nodes[n]['occupancy'] == 0
-            if self.nodes[hn]['occupancy']:
-                for lrep in self.nodes[hn]['lminreps']:
-                    self.nodes[lrep]['occupancy'] += self.nodes[hn]['occupancy']/len(self.nodes[hn]['lminreps'])
-            self.nodes[hn]['occupancy'] = 0
-            # NOTE: the following line could be optional! 
-            # if hn remain active, that means they will be 
-            # used as parents in the next round ...
-            self.nodes[hn]['active'] = False
+        hidden = np.flatnonzero(self._hidden[:N])
+        total = occ[:N].sum()
+        for i in hidden[occ[hidden] != 0]:
+            targets = [k2i[lrep] for lrep in lminreps[i]]
+            occ[targets] += occ[i] / len(targets)
+        occ[hidden] = 0
+        # Fails if a hidden node was chosen as a representative.
+        assert math.isclose(occ[:N].sum(), total, rel_tol = 1e-9, abs_tol = 1e-12)
+        # NOTE: the following line could be optional! 
+        # if hn remain active, that means they will be 
+        # used as parents in the next round ...
+        active[hidden] = False
+        self._selections.clear()
         return len(cg_ndata), len(cg_edata)
 
     def get_occupancies(self):
-        snodes = sorted(self.active_local_mins, key = lambda x: self.nodes[x]['energy'])
-        p0 = [self.nodes[n]['occupancy'] for n in snodes]
+        rows = self._sorted_rows(self._energy, self._selection('active_local_mins')[0])
+        snodes = [self._keys[i] for i in rows]
+        p0 = self._occ[rows]
         #assert np.isclose(sum(p0), 1)
         return snodes, p0
         
-    def get_equilibrium_occupancies(self, snodes):
+    def _build_rate_matrix(self, snodes):
+        """ Returns the rate matrix R[j][i] = k(i -> j) for the given nodes.
+
+        The matrix is filled in a single pass over the coarse grained edges,
+        edges with at least one node outside of snodes are ignored.
+        """
         dim = len(snodes)
+        idx = {n: i for i, n in enumerate(snodes)}
         R = np.zeros((dim, dim))
-        for i, ni in enumerate(snodes):
-            for j, nj in enumerate(snodes):
-                if self.has_cg_edge(ni, nj):
-                    R[j][i] = self.cg_edges[(ni, nj)]['weight']
+        for (ni, nj), d in self._cg_edges.items():
+            i = idx.get(ni)
+            j = idx.get(nj)
+            if i is not None and j is not None:
+                R[j, i] = d['weight']
+        return R
+
+    def get_equilibrium_occupancies(self, snodes):
+        R = self._build_rate_matrix(snodes)
         return get_p8_detbal(R)
  
     def set_occupancies(self, snodes, pt):
-        for i, n in enumerate(snodes):
-            self.nodes[n]['occupancy'] = pt[i]
+        self._occ[[self._key_to_idx[n] for n in snodes]] = pt
 
     def simulate(self, snodes, p0, times, force = None, atol = 1e-4, rtol = 1e-4):
-        assert np.isclose(sum(p0), 1)
+        p0 = np.asarray(p0, dtype = np.float64)
         dim = len(snodes)
 
         if dim == 1:
+            assert math.isclose(p0[0], 1, rel_tol = 1e-5, abs_tol = 1e-8)
             if force is None:
                 force = [times[-1]]
             elif force[-1] < times[-1]:
@@ -381,78 +750,103 @@ class TrafoLandscape:
                 yield ft, [1]
             return
 
-        R = np.zeros((dim, dim))
-        for i, ni in enumerate(snodes):
-            for j, nj in enumerate(snodes):
-                if self.has_cg_edge(ni, nj):
-                    R[j][i] = self.cg_edges[(ni, nj)]['weight']
+        assert math.isclose(p0.sum(), 1, rel_tol = 1e-5, abs_tol = 1e-8)
+        R = self._build_rate_matrix(snodes)
+        if dim == 2 and R[0, 1] > 0 and R[1, 0] > 0:
+            for t, pt in mx_simulate_two_state(R, p0, times, force = force):
+                yield t, pt
+            return
 
         for t, pt in mx_simulate(R, p0, times, force = force, atol = atol, rtol = rtol):
             yield t, pt
         return
 
+    def _nearest_active_nbrs(self, inactive):
+        """ Map inactive nodes to the active nodes that receive their occupancy.
+
+        An inactive node with active neighbors in the coarse grained graph
+        transfers to those neighbors. Otherwise, it transfers to the active
+        neighbors of all such border nodes that can be reached through
+        inactive nodes without active neighbors. The latter nodes form
+        connected components with the same targets, so every component is
+        traversed only once.
+
+        Args:
+            inactive (list): Inactive nodes of the coarse grained graph.
+
+        Returns:
+            dict: inactive node -> set of active nodes.
+        """
+        k2i, active, cg_out = self._key_to_idx, self._active, self._cg_out
+        inactive = set(inactive)
+        border, interior = dict(), []
+        for lm in inactive:
+            nbrs = {y for y in cg_out.get(lm, ()) if y not in inactive}
+            if nbrs:
+                assert all(active[k2i[y]] for y in nbrs)
+                border[lm] = nbrs
+            else:
+                interior.append(lm)
+        reach = dict(border)
+        for lm in interior:
+            if lm in reach:
+                continue
+            comp, seen, stack = [lm], {lm}, [lm]
+            targets = set()
+            while stack:
+                for y in cg_out.get(stack.pop(), ()):
+                    if y in seen:
+                        continue
+                    seen.add(y)
+                    if y in border:
+                        targets |= border[y]
+                    else:
+                        comp.append(y)
+                        stack.append(y)
+            for x in comp:
+                reach[x] = set(targets)
+        return reach
+
     def prune(self, pmin, delth = 10, keep = None):
         """ TODO make sure return values make sense... distinguish lmins and hn.
         """
+        N = self._nnodes
+        keys, k2i = self._keys, self._key_to_idx
+        active, occ, pruned = self._active, self._occ, self._pruned
+
         new_inactive_lms = []
         tot_pruned = 0
-        for lm in sorted(self.active_local_mins, key = lambda x: self.nodes[x]['occupancy']):
+        for i in self._sorted_rows(occ, self._selection('active_local_mins')[0]):
+            lm = keys[i]
             if lm in keep:
                 continue
-            self.nodes[lm]['pruned'] = 0
-            if tot_pruned + self.nodes[lm]['occupancy'] > pmin:
+            pruned[i] = 0
+            if tot_pruned + occ[i] > pmin:
                 break
-            tot_pruned += self.nodes[lm]['occupancy']
-            for hn in self.nodes[lm]['hiddennodes']:
-                assert self.nodes[hn]['occupancy'] == 0
-                self.nodes[hn]['active'] = False
-            self.nodes[lm]['active'] = False
+            tot_pruned += occ[i]
+            for hn in self._hiddennodes[i]:
+                assert occ[k2i[hn]] == 0
+                active[k2i[hn]] = False
+            active[i] = False
             new_inactive_lms.append(lm)
+        self._selections.clear()
 
-        def get_active_nbrs(lm, forbidden = None):
-            # TODO: lazy and probably inefficient implementation.
-            if forbidden is None:
-                forbidden = set()
-            forbidden.add(lm)
-            found = False
-            remaining = []
-            for (x, y) in self.cg_edges:
-                assert x != y
-                if x == lm and y not in forbidden:
-                    if self.nodes[y]['active']:
-                        found = True
-                        yield y
-                    else:
-                        remaining.append(y)
-            if not found:
-                for r in remaining:
-                    assert self.nodes[r]['active'] is False
-                    for a in get_active_nbrs(r, forbidden):
-                        yield a
-            return
-
+        reach = self._nearest_active_nbrs(new_inactive_lms)
         for lm in new_inactive_lms:
-            assert not self.nodes[lm]['active']
-            self.nodes[lm]['occtransfer'] = set(get_active_nbrs(lm))
-            assert len(self.nodes[lm]['occtransfer']) > 0
-
-        pn = set()
-        dn = set()
-        for node in list(self.nodes):
-            if self.nodes[node]['active']:
-                self.nodes[node]['pruned'] = 0
-            else:
-                self.nodes[node]['pruned'] += 1
-                if self.nodes[node]['pruned'] == 1:
-                    # this includes hidden nodes that were not part of the simulation
-                    pn.add(node)
-            drlog.debug(f'After pruning: {node} {self.nodes[node]}')
-            if self.nodes[node]['pruned'] > delth:
-                #TODO: probably quite inefficient...
-                for (x, y) in set(self.edges):
-                    if node in (x, y):
-                        del self._edges[(x,y)]
-                del self._nodes[node]
-                dn.add(node)
+            assert not active[k2i[lm]]
+            otrans = reach.get(lm, set())
+            assert len(otrans) > 0
+            self._occtransfer[k2i[lm]] = otrans
+
+        act = active[:N]
+        pruned[:N][act] = 0
+        pruned[:N][~act] += 1
+        # this includes hidden nodes that were not part of the simulation
+        pn = set(self._select(~act & (pruned[:N] == 1)))
+        if drlog.isEnabledFor(logging.DEBUG):
+            for node in keys:
+                drlog.debug(f'After pruning: {node} {self.nodes[node]}')
+        dn = set(self._select(pruned[:N] > delth))
+        if dn:
+            self._delete_nodes(dn)
         return pn, dn
-
@@ -217,6 +217,48 @@ def mx_simulate(R, p0, times, force = None, atol = 1e-8, rtol = 1e-12):
                 return
     return
 
+def mx_simulate_two_state(R, p0, times, force = None):
+    """ Closed-form simulation of a reversible two-state system.
+
+    With rates k01 = R[1][0] and k10 = R[0][1], the single nonzero
+    eigenvalue of the rate matrix is -(k01 + k10) and the occupancy relaxes
+    exponentially towards equilibrium:
+        p(t) = p8 + (p0 - p8) * exp(-(k01 + k10) * t)
+
+    The output is the same as for mx_simulate, but without matrix
+    decomposition.
+
+    Args:
+        R: A 2x2 rate matrix with entries R[i][j] containing the rate constant
+            for reaction j->i. The diagonal is ignored.
+
+    Yields:
+        t, pt: The time and the population vector.
+    """
+    assert len(R) == 2
+    k01, k10 = R[1][0], R[0][1]
+    if not (k01 > 0 and k10 > 0):
+        raise MxLinalgError(f"Two-state system is not reversible ({k01=}, {k10=}).")
+
+    if force is None:
+        force = [times[-1]]
+    elif force[-1] < times[-1]:
+        force.append(times[-1])
+
+    ktot = k01 + k10
+    p8 = np.array([k10 / ktot, k01 / ktot])
+    d0 = np.asarray(p0, dtype = np.float64) - p8
+    for t in times:
+        pt = p8 + d0 * np.exp(-ktot * t)
+        yield t, np.absolute(pt/sum(np.absolute(pt)))
+        if np.allclose(pt, p8): # No need to calculate any more time points!
+            drlog.debug(f'Equilibrium reached at time {t=}.')
+            for ft in force:
+                if ft > t:
+                    yield ft, p8
+            return
+    return
+
 def main():
     """ A python implementation of (some parts of) the treekin program.
 
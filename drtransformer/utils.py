@@ -65,7 +65,7 @@ def get_simulation_files(TL, basename, treekin = False):
     """
     seq = TL.transcript
     nodes = TL.nodes
-    snodes = sorted(TL.active_local_mins, key = lambda x: TL.nodes[x]['energy'])
+    snodes = sorted(TL.active_local_mins, key = lambda x: TL.nodes[x].energy)
     num = len(snodes) + 1
 
     lfile = basename + '_lands.txt'
@@ -79,14 +79,14 @@ def get_simulation_files(TL, basename, treekin = False):
         bar.write("  ID {}  Energy  {}\n".format(seq, 
             ' '.join(map("{:7d}".format, range(1, num)))))
         for ni, node in enumerate(snodes, 1):
-            ne = nodes[node]['energy']
-            no = nodes[node]['occupancy']
+            ne = nodes[node].energy
+            no = nodes[node].occupancy
             p0.append(no)
 
             # Calculate barrier heights to all other basins.
             barstr = ''
             for other in snodes:
-                oe = nodes[other]['energy']
+                oe = nodes[other].energy
                 sE = TL.get_cg_saddle(node, other)
                 if sE is not None:
                     barstr += ' {:7.2f}'.format((sE - ne)/100)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+import RNA
+import math
+import numpy as np
+import unittest
+from unittest.mock import patch
+
+from drtransformer.landscape import TrafoLandscape
+from drtransformer.linalg import mx_simulate
+
+SKIP = False
+
+@unittest.skipIf(SKIP, "skipping tests")
+class NodeStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.seq = 'GGGAAAUCCCAAAGGGAAAUCCC'
+        self.md = RNA.md()
+
+    def test_addnode(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        ss1 = '(((......)))...........'
+        ss2 = '.......................'
+        TL.addnode(ss1, structure = ss1, occupancy = 1)
+        TL.addnode(ss2, structure = ss2, active = False)
+        assert len(TL.nodes) == 2
+        assert TL.has_node(ss1) and ss1 in TL.nodes
+        assert TL.nodes[ss1]['identity'] == '0'
+        assert TL.nodes[ss1]['occupancy'] == 1
+        assert TL.nodes[ss1]['energy'] == int(round(RNA.fold_compound(self.seq).eval_structure(ss1)*100))
+        assert TL.nodes[ss2]['energy'] == 0
+        assert list(TL.active_nodes) == [ss1]
+        assert list(TL.inactive_nodes) == [ss2]
+        TL.nodes[ss1]['active'] = False
+        TL.nodes[ss2]['active'] = True
+        assert list(TL.active_local_mins) == [ss2]
+
+    def test_node_attributes(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        TL.addnode('a', energy = -5, occupancy = 0.5)
+        node = TL.nodes['a']
+        assert node.energy == node['energy'] == -5
+        assert node.identity == '0'
+        node.occupancy += 0.25
+        assert TL.nodes['a']['occupancy'] == 0.75
+        node.active = False
+        assert list(TL.inactive_nodes) == ['a']
+        node.lminreps = {'b'}
+        assert list(TL.hidden_nodes) == ['a']
+        with self.assertRaises(AttributeError):
+            node.lminreps.add('c')
+        node.lminreps = set()
+        assert list(TL.hidden_nodes) == []
+        with self.assertRaises(AttributeError):
+            node.color = 'red'
+        with self.assertRaises(KeyError):
+            node['color']
+        with self.assertRaises(TypeError):
+            TL.nodes['b'] = node
+
+    def test_node_selections(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1), ('c', -2), ('d', -3)]:
+            TL.addnode(k, energy = e)
+        assert list(TL.active_local_mins) == ['a', 'b', 'c', 'd']
+        TL.nodes['b']['active'] = False
+        TL.nodes['c']['lminreps'] = {'d'}
+        assert list(TL.active_local_mins) == ['a', 'd']
+        assert list(TL.hidden_nodes) == ['c']
+        assert list(TL.inactive_nodes) == ['b']
+        TL.addnode('e', energy = 0)
+        assert list(TL.active_nodes) == ['a', 'c', 'd', 'e']
+        TL._delete_nodes(['a'])
+        assert list(TL.active_local_mins) == ['d', 'e']
+
+    def test_node_arrays_grow(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for e in range(200):
+            TL.addnode(f'n{e}', structure = None, energy = -e, occupancy = e/200)
+        assert len(TL.nodes) == 200
+        assert TL.nodes['n150']['energy'] == -150
+        assert TL.sorted_nodes()[:3] == ['n199', 'n198', 'n197']
+        assert TL.sorted_nodes(attribute = 'occupancy', rev = True, 
+                               nodes = ['n3', 'n5', 'n4']) == ['n5', 'n4', 'n3']
+
+    def test_sorted_nodes_stable(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1), ('c', 0), ('d', -1)]:
+            TL.addnode(k, energy = e)
+        assert TL.sorted_nodes() == ['b', 'd', 'a', 'c']
+        assert TL.sorted_nodes(rev = True) == ['a', 'c', 'b', 'd']
+
+    def test_active_edge_data(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1), ('c', -2)]:
+            TL.addnode(k, energy = e)
+        TL.addedge('a', 'b', saddle_energy = 2)
+        TL.addedge('b', 'a', saddle_energy = 2)
+        TL.addedge('b', 'c', saddle_energy = None)
+        TL.addedge('c', 'b', saddle_energy = None)
+        assert list(TL._active_edge_data()) == [('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'b')]
+        assert list(TL._active_edge_data(saddle = True)) == [('a', 'b'), ('b', 'a')]
+        TL.nodes['a']['active'] = False
+        assert list(TL._active_edge_data()) == [('b', 'c'), ('c', 'b')]
+        assert TL._active_edge_data(saddle = True) == dict()
+
+    def test_addedge(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        TL.addnode('a', energy = 0)
+        TL.addnode('b', energy = -1)
+        TL.addedge('a', 'b', weight = 1, saddle_energy = 5)
+        TL.addedge('a', 'b', weight = 2, saddle_energy = 5)
+        assert TL.edges[('a', 'b')] == {'weight': 1, 'saddle_energy': 5}
+        TL.addedge('a', 'b', saddle_energy = 3)
+        assert TL.edges[('a', 'b')] == {'weight': 1, 'saddle_energy': 3}
+        assert TL.get_saddle('a', 'b') == 3
+        assert TL.get_saddle('b', 'a') is None
+        assert TL._edge_keys == [('a', 'b')]
+
+    def test_delete_nodes(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1), ('c', -2), ('d', -3)]:
+            TL.addnode(k, energy = e)
+        for (x, y) in ['ab', 'bc', 'cd', 'ad']:
+            TL.addedge(x, y, saddle_energy = 1)
+            TL.addedge(y, x, saddle_energy = 1)
+        node = TL.nodes['d']
+        TL._delete_nodes({'b', 'c'})
+        assert list(TL.nodes) == ['a', 'd']
+        assert TL.nodes['d'] is node and node.energy == -3
+        assert not TL.has_node('b')
+        assert TL.nodes['d']['energy'] == -3
+        assert TL.nodes['d']['identity'] == '3'
+        assert list(TL.edges) == [('a', 'd'), ('d', 'a')]
+        assert TL._edges_out == {'a': {'d'}, 'd': {'a'}}
+        assert TL._edges_in == {'a': {'d'}, 'd': {'a'}}
+        assert list(TL._active_edge_data()) == [('a', 'd'), ('d', 'a')]
+        assert TL._edge_src[:2].tolist() == [0, 1]
+
+@unittest.skipIf(SKIP, "skipping tests")
+class CoarseGrainPruneTests(unittest.TestCase):
+    def setUp(self):
+        self.seq = 'GGGAAAUCCCAAAGGGAAAUCCC'
+        self.md = RNA.md()
+
+    def get_landscape(self):
+        # b is hidden behind a (barrier 1 kcal/mol < minh), d is inactive
+        # and passes its occupancy on to a.
+        TL = TrafoLandscape(self.seq, self.md)
+        TL.minh = 300
+        TL.addnode('a', energy = -1000, occupancy = 0.3)
+        TL.addnode('b', energy = -500, occupancy = 0.4)
+        TL.addnode('c', energy = -800, occupancy = 0.2)
+        TL.addnode('d', energy = -200, occupancy = 0.1, active = False, 
+                   pruned = 1, occtransfer = {'a'})
+        for (x, y, se) in [('a', 'b', -400), ('b', 'c', -300), ('a', 'd', 0)]:
+            TL.addedge(x, y, saddle_energy = se)
+            TL.addedge(y, x, saddle_energy = se)
+        return TL
+
+    def test_get_coarse_network(self):
+        TL = self.get_landscape()
+        cn, ce = TL.get_coarse_network()
+        assert (cn, ce) == (2, 2)
+        assert TL.nodes['b'].lminreps == {'a'}
+        assert TL.nodes['a'].hiddennodes == {'b'}
+        assert TL.nodes['c'].hiddennodes == set()
+        assert list(TL.hidden_nodes) == ['b']
+        assert list(TL.active_local_mins) == ['a', 'c']
+        assert not TL.nodes['b'].active
+        snodes, p0 = TL.get_occupancies()
+        assert snodes == ['a', 'c']
+        assert np.allclose(p0, [0.8, 0.2])
+        assert [TL.nodes[n].occupancy for n in 'bd'] == [0, 0]
+        assert TL.get_cg_saddle('a', 'c') == -300
+        assert np.isclose(TL.cg_edges[('c', 'a')]['weight'], 
+                          TL.k0 * math.exp(-5 / TL.RT))
+
+    def test_prune(self):
+        TL = self.get_landscape()
+        TL.get_coarse_network()
+        pn, dn = TL.prune(0.5, delth = 1, keep = [])
+        # c is the least occupied lmin, d was already pruned once.
+        assert pn == {'b', 'c'}
+        assert dn == {'d'}
+        assert list(TL.nodes) == ['a', 'b', 'c']
+        assert list(TL.active_nodes) == ['a']
+        assert TL.nodes['c'].occtransfer == {'a'}
+        assert [TL.nodes[n].pruned for n in 'abc'] == [0, 1, 1]
+        assert set(TL.edges) == {('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'b')}
+        # The pruned occupancy is transferred with the next coarse graining.
+        TL.get_coarse_network()
+        snodes, p0 = TL.get_occupancies()
+        assert snodes == ['a']
+        assert np.allclose(p0, [1])
+
+    def test_transcription(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        TL.fpwm = 4
+        TL.minh = 300
+        for tlen in range(1, len(self.seq) + 1):
+            nn, on, _ = TL.expand()
+            assert TL.transcript_length == tlen
+            assert all(TL.has_node(n) for n in nn | on)
+            TL.get_coarse_network()
+            snodes, p0 = TL.get_occupancies()
+            assert np.isclose(p0.sum(), 1)
+            assert all(len(n) == len(self.seq) for n in snodes)
+            for t, pt in TL.simulate(snodes, p0, [0, 1]):
+                pass
+            TL.set_occupancies(snodes, pt)
+            TL.prune(0.01, delth = 2, keep = [])
+        assert np.isclose(sum(TL.nodes[n].occupancy for n in TL.nodes), 1)
+
+@unittest.skipIf(SKIP, "skipping tests")
+class SimulationTests(unittest.TestCase):
+    def setUp(self):
+        self.seq = 'GGGAAAUCCCAAAGGGAAAUCCC'
+        self.md = RNA.md()
+
+    def test_RT(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        assert TL.RT == 0.61632077549999997
+        TL.md.temperature = 25.0
+        assert TL.RT == 0.61632077549999997 # needs refresh
+        TL.md = TL.md
+        assert TL.RT == (0.61632077549999997 / 310.15) * 298.15
+
+    def test_build_rate_matrix(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1), ('c', -2)]:
+            TL.addnode(k, energy = e)
+        TL._cg_edges = {('a', 'b'): {'weight': 1},
+                        ('b', 'a'): {'weight': 2},
+                        ('b', 'c'): {'weight': 3},
+                        ('c', 'b'): {'weight': 4}}
+        R = TL._build_rate_matrix(['c', 'a', 'b'])
+        assert R.tolist() == [[0, 0, 3], 
+                              [0, 0, 2], 
+                              [4, 1, 0]]
+        R = TL._build_rate_matrix(['a', 'b'])
+        assert R.tolist() == [[0, 2], 
+                              [1, 0]]
+
+    def test_simulate(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        for k, e in [('a', 0), ('b', -1)]:
+            TL.addnode(k, energy = e)
+        TL._cg_edges = {('a', 'b'): {'weight': 1},
+                        ('b', 'a'): {'weight': 2}}
+        times = [0, 0.1, 1, 10]
+
+        # Reversible two-state systems are solved analytically.
+        with patch('drtransformer.landscape.mx_simulate') as mx:
+            sim = list(TL.simulate(['a', 'b'], [1, 0], times))
+            assert not mx.called
+        R = TL._build_rate_matrix(['a', 'b'])
+        ref = list(mx_simulate(R, np.array([1., 0.]), times))
+        assert [t for t, _ in sim] == [t for t, _ in ref]
+        for (_, pt), (_, rt) in zip(sim, ref):
+            assert np.allclose(pt, rt)
+        assert np.allclose(sim[-1][1], [2/3, 1/3])
+
+        # Irreversible two-state systems fall back to mx_simulate.
+        TL._cg_edges = {('a', 'b'): {'weight': 1}}
+        with patch('drtransformer.landscape.mx_simulate', 
+                   return_value = iter([(10, [0, 1])])) as mx:
+            sim = list(TL.simulate(['a', 'b'], [1, 0], times))
+            assert mx.call_count == 1
+            R, p0 = mx.call_args.args[:2]
+            assert R.tolist() == [[0, 0], [1, 0]]
+            assert p0.tolist() == [1, 0]
+        assert sim == [(10, [0, 1])]
+
+        # A single node has to carry all the occupancy.
+        assert list(TL.simulate(['a'], [1], times)) == [(0, [1]), (10, [1])]
+        with self.assertRaises(AssertionError):
+            list(TL.simulate(['a'], [0.5], times))
+
+    def test_nearest_active_nbrs(self):
+        TL = TrafoLandscape(self.seq, self.md)
+        # a - b - c - d - e - g, with b, c, d, e inactive and f - c inactive.
+        for k in 'abcdefg':
+            TL.addnode(k, energy = 0, active = (k in 'ag'))
+        for (x, y) in ['ab', 'bc', 'cd', 'de', 'eg', 'cf']:
+            TL._cg_out.setdefault(x, []).append(y)
+            TL._cg_out.setdefault(y, []).append(x)
+        reach = TL._nearest_active_nbrs(['b', 'c', 'd', 'e', 'f'])
+        # c and d inherit from both border nodes, not just the closest one.
+        assert reach == {'b': {'a'}, 'e': {'g'}, 
+                         'c': {'a', 'g'}, 'd': {'a', 'g'}, 'f': {'a', 'g'}}
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ from itertools import combinations
 from drtransformer.linalg import (get_p8_detbal, 
                                   mx_print,
                                   mx_simulate,
+                                  mx_simulate_two_state,
                                   mx_symmetrize,
                                   mx_decompose_sym)
 
@@ -53,6 +54,19 @@ class MatrixOperations(unittest.TestCase):
                [10, 0.5750044673082901,      0.35872364214983066, 0.06627189054187904]]
         assert np.allclose(out, exp) # if this breaks, use atol and rtol
 
+    def test_simulation_two_state(self):
+        R = np.array([[0, 0.004171],
+                      [3.31e-06, 0]], dtype = np.float64)
+        p0 = np.array([0.2, 0.8])
+        times = [0, 1, 10, 100, 1000]
+        out = list([t, *pt] for t, pt in mx_simulate_two_state(R, p0, times))
+        exp = list([t, *pt] for t, pt in mx_simulate(R.copy(), p0, times))
+        assert np.allclose(out, exp)
+        # Equilibrium reached, skip to the forced time points.
+        times = [0, 1e4, 1e5]
+        out = list(t for t, pt in mx_simulate_two_state(R, p0, times, force = [1e6]))
+        assert out == [0, 1e4, 1e6]
+
     def test_get_p8_detbal_00(self):
         A = np.array([[-0.2,  0.2],
                       [ 0.2, -0.2]], dtype=np.float64)